@@ -0,0 +1,40 @@
+"""
+AWS Client Cache
+Shares a single boto3 session, caches service clients per (service, region)
+and provides small helpers shared by the gateway scripts
+"""
+
+import threading
+from functools import lru_cache
+import boto3
+from botocore.config import Config
+
+
+# One session per process so credential resolution happens only once
+_session = boto3.Session()
+
+# Sessions are not thread-safe, so serialize client creation
+_session_lock = threading.Lock()
+
+# Worker threads used when fanning out per-item API calls; the client pool is sized to match
+MAX_WORKERS = 16
+_client_config = Config(max_pool_connections=MAX_WORKERS)
+
+
+@lru_cache(maxsize=None)
+def get_client(service: str, region: str = "us-east-1"):
+    """Get a cached boto3 client for the given service and region"""
+    with _session_lock:
+        return _session.client(service, region_name=region, config=_client_config)
+
+
+def list_all_gateways(client) -> list[dict]:
+    """List every AgentCore gateway, following pagination"""
+    gateways = []
+    kwargs = {}
+    while True:
+        response = client.list_gateways(**kwargs)
+        gateways.extend(response.get('items', []))
+        if not response.get('nextToken'):
+            return gateways
+        kwargs['nextToken'] = response['nextToken']
@@ -4,144 +4,173 @@ Check Gateway Status
 Displays the current status of the Ansible MCP Gateway and its targets
 """
 
-import subprocess
-import json
+import argparse
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from botocore.exceptions import BotoCoreError, ClientError
+from aws_clients import MAX_WORKERS, get_client, list_all_gateways
 
 
-def run_command(cmd: list[str]) -> dict:
-    """Run a command and return the result"""
+@lru_cache(maxsize=1024)
+def _fmt(dt_str: str) -> str:
+    """Parse and format an ISO datetime string (memoized)"""
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        
-        # Try to parse JSON output
-        try:
-            return json.loads(result.stdout)
-        except json.JSONDecodeError:
-            return {"stdout": result.stdout, "stderr": result.stderr}
-            
-    except subprocess.CalledProcessError as e:
-        return {"error": str(e), "stdout": e.stdout, "stderr": e.stderr}
+        dt = datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
+        return dt.strftime('%Y-%m-%d %H:%M:%S UTC')
+    except ValueError:
+        return dt_str
 
 
 def format_datetime(dt_str):
     """Format datetime string for display"""
-    if isinstance(dt_str, str):
-        try:
-            dt = datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
-            return dt.strftime('%Y-%m-%d %H:%M:%S UTC')
-        except:
-            return dt_str
-    return str(dt_str)
+    if not dt_str:
+        return str(dt_str)
+    return _fmt(str(dt_str))
 
 
 def check_gateways():
     """Check all gateways"""
     print("🔍 Checking MCP Gateways...")
     
-    result = run_command(["agentcore", "gateway", "list-mcp-gateways", "--region", "us-east-1"])
+    client = get_client('bedrock-agentcore-control', 'us-east-1')
     
-    if result.get("status") == "success":
-        gateways = result.get("items", [])
-        print(f"Found {len(gateways)} gateway(s)")
-        
-        for gateway in gateways:
-            print(f"\n📡 Gateway: {gateway.get('name', 'Unknown')}")
-            print(f"   ID: {gateway.get('gatewayId', 'Unknown')}")
-            print(f"   Status: {gateway.get('status', 'Unknown')}")
-            print(f"   Protocol: {gateway.get('protocolType', 'Unknown')}")
-            print(f"   Auth Type: {gateway.get('authorizerType', 'Unknown')}")
-            print(f"   Created: {format_datetime(gateway.get('createdAt', 'Unknown'))}")
-            print(f"   Updated: {format_datetime(gateway.get('updatedAt', 'Unknown'))}")
-            
-            # Check targets for this gateway
-            check_gateway_targets(gateway.get('gatewayId'))
-        
-        return gateways
-    else:
-        print(f"❌ Failed to list gateways: {result}")
+    try:
+        gateways = list_all_gateways(client)
+    except (BotoCoreError, ClientError) as e:
+        print(f"❌ Failed to list gateways: {e}")
         return []
+    
+    print(f"Found {len(gateways)} gateway(s)")
+    
+    # Fetch targets for every gateway concurrently, then print in order
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        gateway_targets = list(executor.map(fetch_gateway_targets, [g.get('gatewayId') for g in gateways]))
+    
+    for gateway, (targets, error) in zip(gateways, gateway_targets):
+        print(f"\n📡 Gateway: {gateway.get('name', 'Unknown')}")
+        print(f"   ID: {gateway.get('gatewayId', 'Unknown')}")
+        print(f"   Status: {gateway.get('status', 'Unknown')}")
+        print(f"   Protocol: {gateway.get('protocolType', 'Unknown')}")
+        print(f"   Auth Type: {gateway.get('authorizerType', 'Unknown')}")
+        print(f"   Created: {format_datetime(gateway.get('createdAt', 'Unknown'))}")
+        print(f"   Updated: {format_datetime(gateway.get('updatedAt', 'Unknown'))}")
+        
+        # Show targets for this gateway
+        print_gateway_targets(gateway.get('gatewayId'), targets, error)
+    
+    return gateways
 
 
-def check_gateway_targets(gateway_id: str):
-    """Check targets for a specific gateway"""
+def fetch_gateway_targets(gateway_id: str) -> tuple[list[dict], Exception]:
+    """Fetch targets for a specific gateway, returning (targets, error)"""
+    client = get_client('bedrock-agentcore-control', 'us-east-1')
+    
+    try:
+        response = client.list_gateway_targets(gatewayIdentifier=gateway_id)
+        return response.get("items", []), None
+    except (BotoCoreError, ClientError) as e:
+        return [], e
+
+
+def print_gateway_targets(gateway_id: str, targets: list[dict], error: Exception = None):
+    """Print previously fetched targets for a specific gateway"""
     print(f"\n🎯 Checking targets for gateway: {gateway_id}")
     
-    result = run_command([
-        "agentcore", "gateway", "list-mcp-gateway-targets",
-        "--id", gateway_id,
-        "--region", "us-east-1"
-    ])
+    if error:
+        print(f"   ❌ Failed to list targets: {error}")
+        return
     
-    if result.get("status") == "success":
-        targets = result.get("items", [])
-        print(f"   Found {len(targets)} target(s)")
+    print(f"   Found {len(targets)} target(s)")
+    
+    for target in targets:
+        print(f"\n   🎯 Target: {target.get('name', 'Unknown')}")
+        print(f"      ID: {target.get('targetId', 'Unknown')}")
+        print(f"      Description: {target.get('description', 'Unknown')}")
+        print(f"      Status: {target.get('status', 'Unknown')}")
+        print(f"      Created: {format_datetime(target.get('createdAt', 'Unknown'))}")
+        print(f"      Updated: {format_datetime(target.get('updatedAt', 'Unknown'))}")
         
-        for target in targets:
-            print(f"\n   🎯 Target: {target.get('name', 'Unknown')}")
-            print(f"      ID: {target.get('targetId', 'Unknown')}")
-            print(f"      URL: {target.get('url', 'Unknown')}")
-            print(f"      Status: {target.get('status', 'Unknown')}")
-            print(f"      Auth Type: {target.get('authType', 'Unknown')}")
-            print(f"      Created: {format_datetime(target.get('createdAt', 'Unknown'))}")
-            print(f"      Updated: {format_datetime(target.get('updatedAt', 'Unknown'))}")
-            
-            # Check if there are any sync errors
-            if target.get('lastSyncError'):
-                print(f"      ❌ Last Sync Error: {target.get('lastSyncError')}")
-            elif target.get('lastSyncTime'):
-                print(f"      ✅ Last Sync: {format_datetime(target.get('lastSyncTime'))}")
-    
-    elif "error" in result:
-        print(f"   ❌ Failed to list targets: {result['error']}")
-    else:
-        print(f"   ❌ Unexpected response: {result}")
+        # Check if there are any sync errors
+        if target.get('lastSyncError'):
+            print(f"      ❌ Last Sync Error: {target.get('lastSyncError')}")
+        elif target.get('lastSyncTime'):
+            print(f"      ✅ Last Sync: {format_datetime(target.get('lastSyncTime'))}")
+
+
+def check_gateway_targets(gateway_id: str):
+    """Check targets for a specific gateway"""
+    targets, error = fetch_gateway_targets(gateway_id)
+    print_gateway_targets(gateway_id, targets, error)
 
 
-def get_gateway_details(gateway_name: str = "ansible-mcp-gateway"):
+def get_gateway_details(gateway_name: str = "ansible-mcp-gateway", gateway_id: str = None):
     """Get detailed information about a specific gateway"""
     print(f"\n🔍 Getting details for gateway: {gateway_name}")
     
-    result = run_command([
-        "agentcore", "gateway", "get-mcp-gateway",
-        "--name", gateway_name,
-        "--region", "us-east-1"
-    ])
+    client = get_client('bedrock-agentcore-control', 'us-east-1')
     
-    if result.get("status") == "success":
-        gateway = result.get("gateway", {})
-        print(f"✅ Gateway Details:")
-        print(f"   Name: {gateway.get('name', 'Unknown')}")
-        print(f"   ID: {gateway.get('gatewayId', 'Unknown')}")
-        print(f"   Status: {gateway.get('status', 'Unknown')}")
-        print(f"   ARN: {gateway.get('arn', 'Unknown')}")
-        return gateway
-    else:
-        print(f"❌ Failed to get gateway details: {result}")
+    try:
+        # The API looks gateways up by ID, so try a known ID first
+        gateway = None
+        if gateway_id:
+            try:
+                gateway = client.get_gateway(gatewayIdentifier=gateway_id)
+            except ClientError as e:
+                # A stale or placeholder ID should not hide the gateway we are after
+                code = e.response.get('Error', {}).get('Code')
+                if code not in ('ResourceNotFoundException', 'ValidationException'):
+                    raise
+                print(f"⚠️  Gateway ID '{gateway_id}' could not be used ({code}), looking up by name")
+            
+            if gateway and gateway.get('name') != gateway_name:
+                print(f"⚠️  Gateway '{gateway_id}' is named '{gateway.get('name')}', looking up '{gateway_name}' by name")
+                gateway = None
+        
+        # Resolve the name when no usable ID is known
+        if gateway is None:
+            summary = next((g for g in list_all_gateways(client) if g.get('name') == gateway_name), None)
+            if not summary:
+                print(f"❌ Failed to get gateway details: gateway '{gateway_name}' not found")
+                return None
+            gateway = client.get_gateway(gatewayIdentifier=summary['gatewayId'])
+    except (BotoCoreError, ClientError) as e:
+        print(f"❌ Failed to get gateway details: {e}")
         return None
+    
+    print(f"✅ Gateway Details:")
+    print(f"   Name: {gateway.get('name', 'Unknown')}")
+    print(f"   ID: {gateway.get('gatewayId', 'Unknown')}")
+    print(f"   Status: {gateway.get('status', 'Unknown')}")
+    print(f"   ARN: {gateway.get('gatewayArn', 'Unknown')}")
+    print(f"   URL: {gateway.get('gatewayUrl', 'Unknown')}")
+    return gateway
 
 
 def main():
     """Main check function"""
-    print("🔍 Checking Ansible MCP Gateway Status...\n")
+    parser = argparse.ArgumentParser(description="Check Ansible MCP Gateway status")
+    parser.add_argument("--all", action="store_true", help="list every gateway and its targets")
+    args = parser.parse_args()
     
-    # Check all gateways
-    gateways = check_gateways()
+    print("🔍 Checking Ansible MCP Gateway Status...\n")
     
-    # Look for our specific gateway
-    ansible_gateway = None
-    for gateway in gateways:
-        if gateway.get('name') == 'ansible-mcp-gateway':
-            ansible_gateway = gateway
-            break
+    if args.all:
+        # Check all gateways, then pick ours out of the list
+        gateways = check_gateways()
+        ansible_gateway = next((g for g in gateways if g.get('name') == 'ansible-mcp-gateway'), None)
+        if ansible_gateway:
+            get_gateway_details("ansible-mcp-gateway", ansible_gateway['gatewayId'])
+    else:
+        # Look up our specific gateway directly (by GATEWAY_ID when set)
+        ansible_gateway = get_gateway_details("ansible-mcp-gateway", os.getenv("GATEWAY_ID"))
+        if ansible_gateway:
+            check_gateway_targets(ansible_gateway['gatewayId'])
     
     if ansible_gateway:
         print(f"\n✅ Ansible MCP Gateway found and {'READY' if ansible_gateway.get('status') == 'READY' else 'NOT READY'}")
-        
-        # Get detailed information
-        get_gateway_details("ansible-mcp-gateway")
-        
     else:
         print("\n❌ Ansible MCP Gateway not found")
         print("Run 'python deploy_gateway.py' to create it")
@@ -5,71 +5,94 @@ Creates the MCP server target for the Ansible MCP Gateway using OAuth credential
 """
 
 import json
-import boto3
 import sys
 import os
+from botocore.exceptions import BotoCoreError, ClientError
+from aws_clients import get_client
 
 
-def find_oauth_provider_arn():
-    """Find the OAuth credential provider ARN for ansible-mcp"""
-    print("🔍 Looking for OAuth credential provider...")
+# Error codes worth retrying through the list API
+TRANSIENT_ERROR_CODES = {
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'ServiceUnavailableException',
+    'InternalServerException',
+}
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Check whether an AWS error is a throttling/5xx (or connection) failure"""
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code')
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+        return code in TRANSIENT_ERROR_CODES or status >= 500
+    return isinstance(error, BotoCoreError)
+
+
+# Provider ARNs already found, keyed by provider name (misses are not cached so they can be retried)
+_provider_arns = {}
+
+
+def find_oauth_provider_arn(provider_name: str = 'ansible-mcp-auth0-custom-provider', out=None):
+    """Find the OAuth credential provider ARN (memoized per provider name once found)"""
+    if provider_name not in _provider_arns:
+        provider_arn = _lookup_oauth_provider_arn(provider_name, out or sys.stdout)
+        if not provider_arn:
+            return None
+        _provider_arns[provider_name] = provider_arn
+    return _provider_arns[provider_name]
+
+
+def _lookup_oauth_provider_arn(provider_name: str, out):
+    """Look up the OAuth credential provider ARN by name, falling back to listing on transient errors"""
+    print("🔍 Looking for OAuth credential provider...", file=out)
     
-    client = boto3.client('bedrock-agentcore-control', region_name='us-east-1')
+    client = get_client('bedrock-agentcore-control', 'us-east-1')
     
+    # Try to get the specific provider by name
     try:
-        # Try to get the specific provider by name
-        try:
-            response = client.get_oauth2_credential_provider(
-                name='ansible-mcp-auth0-custom-provider'
-            )
-            provider_arn = response['credentialProviderArn']
-            print(f"✅ Found OAuth provider: {provider_arn}")
-            return provider_arn
-        except client.exceptions.ResourceNotFoundException:
-            print("❌ OAuth credential provider 'ansible-mcp-auth0-custom-provider' not found")
-            print("Run 'python create_oauth_provider.py' first to create the provider")
+        response = client.get_oauth2_credential_provider(name=provider_name)
+        provider_arn = response['credentialProviderArn']
+        print(f"✅ Found OAuth provider: {provider_arn}", file=out)
+        return provider_arn
+    except client.exceptions.ResourceNotFoundException:
+        print(f"❌ OAuth credential provider '{provider_name}' not found", file=out)
+        print("Run 'python create_oauth_provider.py' first to create the provider", file=out)
+        return None
+    except (BotoCoreError, ClientError) as e:
+        print(f"❌ Failed to get OAuth provider: {e}", file=out)
+        if not is_transient_error(e):
             return None
-        
-    except Exception as e:
-        print(f"❌ Failed to get OAuth provider: {e}")
-        # Try listing as fallback
-        try:
-            response = client.list_oauth2_credential_providers()
+    
+    # Transient failure - try listing as fallback, stopping at the first match
+    try:
+        kwargs = {'maxResults': 20}
+        while True:
+            response = client.list_oauth2_credential_providers(**kwargs)
             
-            # Look for our provider
-            for provider in response.get('oauth2CredentialProviders', []):
-                if provider['name'] == 'ansible-mcp-auth0-custom-provider':
+            for provider in response.get('credentialProviders', []):
+                if provider['name'] == provider_name:
                     provider_arn = provider['credentialProviderArn']
-                    print(f"✅ Found OAuth provider via list: {provider_arn}")
+                    print(f"✅ Found OAuth provider via list: {provider_arn}", file=out)
                     return provider_arn
             
-            print("❌ OAuth credential provider 'ansible-mcp-auth0-custom-provider' not found in list")
-            return None
-            
-        except Exception as list_error:
-            print(f"❌ Failed to list OAuth providers: {list_error}")
-            return None
+            if not response.get('nextToken'):
+                break
+            kwargs['nextToken'] = response['nextToken']
+        
+        print(f"❌ OAuth credential provider '{provider_name}' not found in list", file=out)
+        return None
+        
+    except (BotoCoreError, ClientError) as list_error:
+        print(f"❌ Failed to list OAuth providers: {list_error}", file=out)
+        return None
 
 
-def create_mcp_target():
-    """Create MCP server target with OAuth credential provider"""
-    print("🎯 Creating MCP Gateway Target...")
-    
-    # Find OAuth provider ARN
-    provider_arn = find_oauth_provider_arn()
-    if not provider_arn:
-        return False
-    
-    # Gateway details - get from environment or use defaults
-    gateway_identifier = os.getenv("GATEWAY_ID", "your-gateway-id")
-    
-    # Create AgentCore Control client
-    client = boto3.client('bedrock-agentcore-control', region_name='us-east-1')
-    
-    # Prepare the request
+def build_target_request(gateway_identifier: str, provider_arn: str, name: str, description: str = None) -> dict:
+    """Build the create_gateway_target request for the MCP server with OAuth client credentials"""
     request_data = {
         'gatewayIdentifier': gateway_identifier,
-        'name': 'ansible-mcp-target-no-scopes',
+        'name': name,
         'targetConfiguration': {
             'mcp': {
                 'mcpServer': {
@@ -93,6 +116,28 @@ def create_mcp_target():
             }
         ]
     }
+    if description:
+        request_data['description'] = description
+    return request_data
+
+
+def create_mcp_target():
+    """Create MCP server target with OAuth credential provider"""
+    print("🎯 Creating MCP Gateway Target...")
+    
+    # Find OAuth provider ARN
+    provider_arn = find_oauth_provider_arn()
+    if not provider_arn:
+        return False
+    
+    # Gateway details - get from environment or use defaults
+    gateway_identifier = os.getenv("GATEWAY_ID", "your-gateway-id")
+    
+    # Create AgentCore Control client
+    client = get_client('bedrock-agentcore-control', 'us-east-1')
+    
+    # Prepare the request
+    request_data = build_target_request(gateway_identifier, provider_arn, 'ansible-mcp-target-no-scopes')
     
     try:
         print(f"Creating MCP target with OAuth provider: {provider_arn}")
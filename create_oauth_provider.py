@@ -5,7 +5,7 @@ Creates an OAuth2 credential provider for Auth0 to be used with MCP Gateway targ
 """
 
 import json
-import boto3
+from aws_clients import get_client
 from oauth_manager import get_oauth_config
 
 
@@ -22,7 +22,7 @@ def create_oauth2_credential_provider():
         return None
     
     # Create AgentCore Control client
-    client = boto3.client('bedrock-agentcore-control', region_name='us-east-1')
+    client = get_client('bedrock-agentcore-control', 'us-east-1')
     
     # Prepare the request
     request_data = {
@@ -4,41 +4,32 @@ Deploy Ansible MCP Gateway
 Creates an AgentCore Gateway that connects to the Ansible MCP server with OAuth authentication
 """
 
-import subprocess
+import io
+import os
 import sys
-import json
-from oauth_manager import create_oauth_token_manager
+import time
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import BotoCoreError, ClientError
+from aws_clients import get_client, list_all_gateways
+from create_mcp_target import build_target_request, find_oauth_provider_arn
 
 
-def run_command(cmd: list[str]) -> dict:
-    """Run a command and return the result"""
-    try:
-        print(f"Running: {' '.join(cmd)}")
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        
-        # Try to parse JSON output
-        try:
-            return json.loads(result.stdout)
-        except json.JSONDecodeError:
-            return {"stdout": result.stdout, "stderr": result.stderr}
-            
-    except subprocess.CalledProcessError as e:
-        print(f"Command failed: {e}")
-        print(f"stdout: {e.stdout}")
-        print(f"stderr: {e.stderr}")
-        return {"error": str(e), "stdout": e.stdout, "stderr": e.stderr}
-
-
-def check_existing_gateway() -> dict:
+def check_existing_gateway(out=None) -> dict:
     """Check if gateway already exists"""
-    print("Checking for existing gateways...")
-    result = run_command(["agentcore", "gateway", "list-mcp-gateways", "--region", "us-east-1"])
+    out = out or sys.stdout
+    print("Checking for existing gateways...", file=out)
+    client = get_client('bedrock-agentcore-control', 'us-east-1')
+    
+    try:
+        gateways = list_all_gateways(client)
+    except (BotoCoreError, ClientError) as e:
+        print(f"Failed to list gateways: {e}", file=out)
+        return None
     
-    if result.get("status") == "success":
-        for gateway in result.get("items", []):
-            if gateway.get("name") == "ansible-mcp-gateway":
-                print(f"Found existing gateway: {gateway['gatewayId']}")
-                return gateway
+    for gateway in gateways:
+        if gateway.get("name") == "ansible-mcp-gateway":
+            print(f"Found existing gateway: {gateway['gatewayId']}", file=out)
+            return gateway
     
     return None
 
@@ -46,74 +37,130 @@ def check_existing_gateway() -> dict:
 def delete_gateway(gateway_id: str) -> bool:
     """Delete existing gateway"""
     print(f"Deleting existing gateway: {gateway_id}")
-    result = run_command(["agentcore", "gateway", "delete-mcp-gateway", "--id", gateway_id])
+    client = get_client('bedrock-agentcore-control', 'us-east-1')
     
-    if "error" not in result:
+    try:
+        client.delete_gateway(gatewayIdentifier=gateway_id)
         print("Gateway deleted successfully")
         return True
-    else:
-        print(f"Failed to delete gateway: {result}")
+    except (BotoCoreError, ClientError) as e:
+        print(f"Failed to delete gateway: {e}")
         return False
 
 
+def wait_until_ready(client, gateway_id: str, deadline: float = 120) -> bool:
+    """Poll the gateway with exponential backoff until it is READY or the deadline passes"""
+    start = time.monotonic()
+    delay = 0.5
+    
+    while time.monotonic() < start + deadline:
+        status = client.get_gateway(gatewayIdentifier=gateway_id)['status']
+        if status in ('READY', 'ACTIVE'):
+            return True
+        if status == 'FAILED':
+            print(f"Gateway entered {status} state")
+            return False
+        time.sleep(delay)
+        delay = min(delay * 1.5, 5.0)
+    
+    print(f"Timed out after {deadline} seconds waiting for gateway to be ready")
+    return False
+
+
+def wait_until_deleted(client, gateway_id: str, deadline: float = 120) -> bool:
+    """Poll the gateway with exponential backoff until it no longer exists or the deadline passes"""
+    start = time.monotonic()
+    delay = 0.5
+    
+    while time.monotonic() < start + deadline:
+        try:
+            client.get_gateway(gatewayIdentifier=gateway_id)
+        except client.exceptions.ResourceNotFoundException:
+            return True
+        time.sleep(delay)
+        delay = min(delay * 1.5, 5.0)
+    
+    print(f"Timed out after {deadline} seconds waiting for gateway deletion")
+    return False
+
+
 def create_gateway() -> dict:
     """Create new MCP gateway"""
     print("Creating new Ansible MCP gateway...")
     
-    result = run_command([
-        "agentcore", "gateway", "create-mcp-gateway",
-        "--name", "ansible-mcp-gateway",
-        "--region", "us-east-1"
-    ])
-    
-    if result.get("status") == "success":
-        gateway_id = result.get("gatewayId")
-        print(f"Gateway created successfully: {gateway_id}")
-        return result
-    else:
-        print(f"Failed to create gateway: {result}")
+    # Gateway IAM role and inbound (Cognito) JWT authorizer - get from environment
+    role_arn = os.getenv("GATEWAY_ROLE_ARN")
+    discovery_url = os.getenv("GATEWAY_DISCOVERY_URL")
+    allowed_clients = [c.strip() for c in os.getenv("GATEWAY_ALLOWED_CLIENTS", "").split(",") if c.strip()]
+    
+    if not all([role_arn, discovery_url, allowed_clients]):
+        print("Failed to create gateway: set GATEWAY_ROLE_ARN, GATEWAY_DISCOVERY_URL and GATEWAY_ALLOWED_CLIENTS")
         return None
+    
+    client = get_client('bedrock-agentcore-control', 'us-east-1')
+    
+    try:
+        result = client.create_gateway(
+            name="ansible-mcp-gateway",
+            description="Ansible MCP Gateway",
+            roleArn=role_arn,
+            protocolType="MCP",
+            authorizerType="CUSTOM_JWT",
+            authorizerConfiguration={
+                "customJWTAuthorizer": {
+                    "discoveryUrl": discovery_url,
+                    "allowedClients": allowed_clients
+                }
+            }
+        )
+    except (BotoCoreError, ClientError) as e:
+        print(f"Failed to create gateway: {e}")
+        return None
+    
+    gateway_id = result.get("gatewayId")
+    print(f"Gateway created successfully: {gateway_id}")
+    return result
 
 
-def create_gateway_target(gateway_id: str, oauth_token: str) -> dict:
+def create_gateway_target(gateway_id: str, provider_arn: str) -> dict:
     """Create gateway target with OAuth authentication"""
     print(f"Creating gateway target for gateway: {gateway_id}")
     
-    # MCP server configuration - get from environment or use placeholder
-    mcp_server_url = os.getenv("MCP_SERVER_URL", "https://your-mcp-server.example.com/mcp")
-    
-    result = run_command([
-        "agentcore", "gateway", "create-mcp-gateway-target",
-        "--gateway-id", gateway_id,
-        "--name", "ansible-mcp-target",
-        "--url", mcp_server_url,
-        "--description", "Ansible MCP Server Target",
-        "--auth-type", "bearer",
-        "--auth-token", oauth_token,
-        "--region", "us-east-1"
-    ])
-    
-    if result.get("status") == "success":
-        print("Gateway target created successfully")
-        return result
-    else:
-        print(f"Failed to create gateway target: {result}")
+    client = get_client('bedrock-agentcore-control', 'us-east-1')
+    
+    try:
+        result = client.create_gateway_target(**build_target_request(
+            gateway_id,
+            provider_arn,
+            "ansible-mcp-target",
+            description="Ansible MCP Server Target"
+        ))
+    except (BotoCoreError, ClientError) as e:
+        print(f"Failed to create gateway target: {e}")
         return None
+    
+    print("Gateway target created successfully")
+    return result
 
 
 def main():
     """Main deployment function"""
     print("🚀 Deploying Ansible MCP Gateway...")
     
+    client = get_client('bedrock-agentcore-control', 'us-east-1')
+    
     try:
-        # Get OAuth token
-        print("Getting OAuth token...")
-        token_manager = create_oauth_token_manager()
-        oauth_token = token_manager.get_token()
-        print("✅ OAuth token obtained")
+        # These startup lookups are independent, so overlap their round-trips:
+        # the OAuth credential provider used by the gateway target and any existing gateway.
+        # Each buffers its output so the messages print in a fixed order
+        existing_out, provider_out = io.StringIO(), io.StringIO()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            existing_future = executor.submit(check_existing_gateway, out=existing_out)
+            provider_future = executor.submit(find_oauth_provider_arn, out=provider_out)
         
-        # Check for existing gateway
-        existing_gateway = check_existing_gateway()
+        existing_gateway = existing_future.result()
+        provider_arn = provider_future.result()
+        sys.stdout.write(existing_out.getvalue() + provider_out.getvalue())
         
         if existing_gateway:
             response = input(f"Gateway '{existing_gateway['name']}' already exists. Delete and recreate? (y/N): ")
@@ -121,15 +168,18 @@ def main():
                 if not delete_gateway(existing_gateway['gatewayId']):
                     print("❌ Failed to delete existing gateway")
                     sys.exit(1)
-                # Wait a moment for deletion to complete
-                import time
-                time.sleep(5)
+                # Wait for deletion to complete before reusing the name
+                print("Waiting for gateway deletion to complete...")
+                if not wait_until_deleted(client, existing_gateway['gatewayId']):
+                    print("❌ Existing gateway was not deleted in time")
+                    sys.exit(1)
             else:
                 print("Using existing gateway")
                 gateway_id = existing_gateway['gatewayId']
                 
                 # Try to create target (might already exist)
-                create_gateway_target(gateway_id, oauth_token)
+                if provider_arn:
+                    create_gateway_target(gateway_id, provider_arn)
                 return
         
         # Create new gateway
@@ -140,13 +190,20 @@ def main():
         
         gateway_id = gateway_result.get("gatewayId")
         
+        if not provider_arn:
+            print("✅ Gateway created without a target")
+            print(f"Gateway ID: {gateway_id}")
+            print("Run 'python create_oauth_provider.py' and then 'python create_mcp_target.py' to add the target")
+            return
+        
         # Wait for gateway to be ready
         print("Waiting for gateway to be ready...")
-        import time
-        time.sleep(10)
+        if not wait_until_ready(client, gateway_id):
+            print("❌ Gateway did not become ready")
+            sys.exit(1)
         
         # Create gateway target
-        target_result = create_gateway_target(gateway_id, oauth_token)
+        target_result = create_gateway_target(gateway_id, provider_arn)
         if not target_result:
             print("❌ Failed to create gateway target")
             sys.exit(1)
@@ -4,10 +4,10 @@ Get Auth0 Token
 Test script to get OAuth token for testing MCP connections
 """
 
-import requests
 import json
 import os
 import sys
+from oauth_http import token_session
 
 # OAuth configuration - load from environment or Parameter Store
 CLIENT_ID = os.getenv("ANSIBLE_MCP_CLIENT_ID")
@@ -25,6 +25,9 @@ if not all([CLIENT_ID, CLIENT_SECRET, ISSUER_URL, AUDIENCE]):
     print("\nOr load from AWS Parameter Store using oauth_manager.py")
     sys.exit(1)
 
+# Pooled HTTP session with retries for transient IdP errors
+_session = token_session()
+
 def get_auth0_token():
     """Get OAuth token for testing"""
     token_url = f"{ISSUER_URL.rstrip('/')}/oauth/token"
@@ -41,7 +44,7 @@ def get_auth0_token():
     }
     
     try:
-        response = requests.post(token_url, json=payload, headers=headers, timeout=10)
+        response = _session.post(token_url, json=payload, headers=headers, timeout=10)
         response.raise_for_status()
         
         token_data = response.json()
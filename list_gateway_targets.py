@@ -4,9 +4,10 @@ List Gateway Targets
 Lists all targets for the Ansible MCP Gateway
 """
 
-import boto3
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from aws_clients import MAX_WORKERS, get_client
 
 
 def list_gateway_targets():
@@ -16,7 +17,7 @@ def list_gateway_targets():
     # Get gateway ID from environment or use default
     gateway_identifier = os.getenv("GATEWAY_ID", "your-gateway-id")
     
-    client = boto3.client('bedrock-agentcore-control', region_name='us-east-1')
+    client = get_client('bedrock-agentcore-control', 'us-east-1')
     
     try:
         response = client.list_gateway_targets(
@@ -31,24 +32,32 @@ def list_gateway_targets():
         
         print(f"Found {len(targets)} target(s):")
         
-        for target in targets:
+        def get_details(target):
+            """Fetch detailed target info, returning (response, error)"""
+            try:
+                return client.get_gateway_target(
+                    gatewayIdentifier=gateway_identifier,
+                    targetId=target['targetId']
+                ), None
+            except Exception as e:
+                return None, e
+        
+        # Fetch target details concurrently, then print in the original order
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            details = list(executor.map(get_details, targets))
+        
+        for target, (detail_response, error) in zip(targets, details):
             print(f"\n📌 Target: {target['name']}")
             print(f"   ID: {target['targetId']}")
             print(f"   Status: {target['status']}")
             print(f"   Type: {target.get('targetType', 'N/A')}")
             
-            # Get detailed target info
-            try:
-                detail_response = client.get_gateway_target(
-                    gatewayIdentifier=gateway_identifier,
-                    targetId=target['targetId']
-                )
-                
-                print(f"   Configuration: {json.dumps(detail_response.get('targetConfiguration', {}), indent=6)}")
-                print(f"   Credentials: {json.dumps(detail_response.get('credentialProviderConfigurations', []), indent=6)}")
-                
-            except Exception as e:
-                print(f"   Error getting details: {e}")
+            if error:
+                print(f"   Error getting details: {error}")
+                continue
+            
+            print(f"   Configuration: {json.dumps(detail_response.get('targetConfiguration', {}), indent=6)}")
+            print(f"   Credentials: {json.dumps(detail_response.get('credentialProviderConfigurations', []), indent=6)}")
         
     except Exception as e:
         print(f"❌ Failed to list gateway targets: {e}")
@@ -0,0 +1,25 @@
+"""
+OAuth HTTP Session
+Pooled, retrying HTTP session for OAuth token requests (no AWS dependencies)
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def token_session() -> requests.Session:
+    """Create a pooled HTTP session that retries transient IdP errors on token requests"""
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=4,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset(['POST']),
+            raise_on_status=False
+        )
+    ))
+    return session
@@ -4,10 +4,23 @@ Handles OAuth 2.0 Client Credentials flow with token caching and refresh
 """
 
 import os
+import json
 import time
+import hashlib
+import stat
+import threading
 import requests
-import boto3
+from pathlib import Path
 from typing import Optional
+from aws_clients import get_client
+from oauth_http import token_session
+
+
+# Pooled HTTP session so token refreshes reuse the TLS connection to the IdP
+_session = token_session()
+
+# Per-user token cache location (kept out of the shared system temp directory)
+_CACHE_DIR = Path(os.getenv('XDG_CACHE_HOME') or Path.home() / '.cache') / 'infragenie'
 
 
 class OAuthTokenManager:
@@ -20,34 +33,83 @@ class OAuthTokenManager:
         self.audience = audience
         self.token = None
         self.token_expires_at = 0
+        self._buffer_seconds = 60
+        self._lock = threading.Lock()
+        
+        # The token request never changes, so build and encode it once
+        self._token_url = f"{self.issuer_url}/oauth/token"
+        self._body = json.dumps({
+            "grant_type": "client_credentials",
+            "client_id": client_id,
+            "client_secret": client_secret,
+            "audience": audience
+        }).encode()
+        self._headers = {"Content-Type": "application/json"}
+        
+        # On-disk cache in a private per-user directory so short-lived scripts can reuse a still-valid token
+        cache_key = hashlib.sha256(f"{client_id}|{audience}|{self.issuer_url}".encode()).hexdigest()[:16]
+        self.cache_path = _CACHE_DIR / f"oauth_{cache_key}.json"
     
     def get_token(self) -> str:
         """Get a valid OAuth token, refreshing if necessary"""
-        current_time = time.time()
+        # Serialize refreshes so concurrent callers share one token request
+        with self._lock:
+            current_time = time.time()
+            
+            # Check if we need to refresh the token (with 60 second buffer)
+            if not self.token or current_time >= (self.token_expires_at - self._buffer_seconds):
+                if not self._load_cached_token():
+                    self._refresh_token()
+                    self._save_cached_token()
+            
+            return self.token
+    
+    def _load_cached_token(self) -> bool:
+        """Adopt a token from the disk cache if it is still valid and privately owned"""
+        try:
+            # O_NOFOLLOW and getuid() are POSIX-only, so skip those checks on Windows
+            fd = os.open(self.cache_path, os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0))
+            with os.fdopen(fd) as f:
+                # Only trust a cache file that this user owns and nobody else can read
+                if hasattr(os, 'getuid'):
+                    st = os.fstat(f.fileno())
+                    if st.st_uid != os.getuid() or stat.S_IMODE(st.st_mode) != 0o600:
+                        return False
+                cached = json.load(f)
+            token = cached["token"]
+            expires_at = float(cached["expires_at"])
+        except Exception:
+            # Any unreadable cache is just a cache miss
+            return False
         
-        # Check if we need to refresh the token (with 60 second buffer)
-        if not self.token or current_time >= (self.token_expires_at - 60):
-            self._refresh_token()
+        if expires_at - self._buffer_seconds <= time.time():
+            return False
         
-        return self.token
+        self.token = token
+        self.token_expires_at = expires_at
+        return True
+    
+    def _save_cached_token(self):
+        """Atomically write the current token to the disk cache (mode 0600)"""
+        tmp_path = self.cache_path.with_name(f"{self.cache_path.name}.{os.getpid()}.tmp")
+        try:
+            _CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+            os.chmod(_CACHE_DIR, 0o700)
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump({"token": self.token, "expires_at": self.token_expires_at}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Warning: failed to cache OAuth token: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
     
     def _refresh_token(self):
         """Refresh the OAuth token using client credentials flow"""
-        token_url = f"{self.issuer_url}/oauth/token"
-        
-        payload = {
-            "grant_type": "client_credentials",
-            "client_id": self.client_id,
-            "client_secret": self.client_secret,
-            "audience": self.audience
-        }
-        
-        headers = {
-            "Content-Type": "application/json"
-        }
-        
         try:
-            response = requests.post(token_url, json=payload, headers=headers, timeout=10)
+            response = _session.post(self._token_url, data=self._body, headers=self._headers, timeout=10)
             response.raise_for_status()
             
             token_data = response.json()
@@ -77,18 +139,28 @@ def get_oauth_config() -> tuple[str, str, str, str]:
     # If environment variables are not available, try AWS Parameter Store
     if not all([client_id, client_secret, issuer_url, audience]):
         try:
-            ssm = boto3.client('ssm', region_name='us-east-1')
-            
-            # Get parameters from Parameter Store
-            if not client_id:
-                client_id = ssm.get_parameter(Name='/infragenie/oauth/client_id', WithDecryption=True)['Parameter']['Value']
-            if not client_secret:
-                client_secret = ssm.get_parameter(Name='/infragenie/oauth/client_secret', WithDecryption=True)['Parameter']['Value']
-            if not issuer_url:
-                issuer_url = ssm.get_parameter(Name='/infragenie/oauth/issuer_url')['Parameter']['Value']
-            if not audience:
-                audience = ssm.get_parameter(Name='/infragenie/oauth/audience')['Parameter']['Value']
-                
+            ssm = get_client('ssm', 'us-east-1')
+
+            # Fetch only the missing parameters in a single round-trip
+            names = [
+                name for name, value in (
+                    ('/infragenie/oauth/client_id', client_id),
+                    ('/infragenie/oauth/client_secret', client_secret),
+                    ('/infragenie/oauth/issuer_url', issuer_url),
+                    ('/infragenie/oauth/audience', audience),
+                ) if not value
+            ]
+            response = ssm.get_parameters(Names=names, WithDecryption=True)
+
+            if response.get('InvalidParameters'):
+                raise RuntimeError(f"Parameters not found: {', '.join(response['InvalidParameters'])}")
+
+            values = {p['Name']: p['Value'] for p in response['Parameters']}
+            client_id = client_id or values.get('/infragenie/oauth/client_id')
+            client_secret = client_secret or values.get('/infragenie/oauth/client_secret')
+            issuer_url = issuer_url or values.get('/infragenie/oauth/issuer_url')
+            audience = audience or values.get('/infragenie/oauth/audience')
+
             print("OAuth configuration loaded from AWS Parameter Store")
             
         except Exception as e:
@@ -107,4 +179,19 @@ def get_oauth_config() -> tuple[str, str, str, str]:
 def create_oauth_token_manager() -> OAuthTokenManager:
     """Create OAuth token manager with configuration from environment/Parameter Store"""
     client_id, client_secret, issuer_url, audience = get_oauth_config()
-    return OAuthTokenManager(client_id, client_secret, issuer_url, audience)
\ No newline at end of file
+    return OAuthTokenManager(client_id, client_secret, issuer_url, audience)
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def default_token_manager() -> OAuthTokenManager:
+    """Get the process-wide OAuth token manager, loading configuration only once"""
+    global _default_manager
+    
+    # Lock so concurrent first callers do not each load the configuration
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = create_oauth_token_manager()
+        return _default_manager
@@ -4,264 +4,338 @@ Test Gateway HTTP Access
 Test if the gateway URL provides access to Ansible MCP tools using simple HTTP requests
 """
 
+import io
 import requests
 import json
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+# Use orjson for request/response JSON when available, stdlib json otherwise
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+    _json_loads = json.loads
 
-def test_gateway_http():
+# JSON-RPC requests and headers never change, so build and encode them once
+_BASE_HEADERS = {
+    "Content-Type": "application/json",
+    "Accept": "application/json, text/event-stream"
+}
+
+_TOOLS_PAYLOAD = {
+    "jsonrpc": "2.0",
+    "id": 2,
+    "method": "tools/list"
+}
+
+
+def _initialize_payload(client_name: str) -> dict:
+    """Build the JSON-RPC initialize request for the given client name"""
+    return {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "initialize",
+        "params": {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {"tools": {}},
+            "clientInfo": {"name": client_name, "version": "1.0.0"}
+        }
+    }
+
+
+_TOOLS_PAYLOAD_BYTES = _json_dumps(_TOOLS_PAYLOAD)
+_GATEWAY_INIT_PAYLOAD_BYTES = _json_dumps(_initialize_payload("gateway-http-test"))
+_DIRECT_INIT_PAYLOAD_BYTES = _json_dumps(_initialize_payload("direct-test"))
+
+# (connect, read) timeouts: fail fast on a stuck handshake, allow for a slow tools/list
+_TIMEOUT = (3.05, 10)
+
+# Shared session so both tests reuse pooled keep-alive connections. Transient
+# 429/5xx responses are retried with backoff; POST is safe to retry here because
+# initialize and tools/list have no side effects and carry fixed JSON-RPC ids
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=10,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.25,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['POST']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+))
+
+
+def _parse_sse_data(text: str) -> str:
+    """Extract the data payload of the first SSE event in text"""
+    # Only the first event is needed, so cut it off without scanning the rest
+    head, _, _ = text.partition('\n\n')
+    
+    buf = []
+    for line in head.splitlines():
+        if line[:5] == 'data:':
+            buf.append(line[5:].lstrip(' '))
+        elif not line and buf:
+            # A blank line ends the event (covers CRLF-framed streams)
+            break
+    return '\n'.join(buf)
+
+
+def _parse_response(response):
+    """Parse a JSON-RPC response body, unwrapping SSE framing if present"""
+    # Work on the raw bytes so the body is not decoded (and charset-sniffed) as text first
+    body = response.content
+    if body[:6] == b'event:':
+        # SSE streams are always UTF-8
+        data = _parse_sse_data(body.decode('utf-8'))
+        if data:
+            return _json_loads(data)
+    return _json_loads(body)
+
+
+def _initialize_then_list_tools(session, url: str, headers: dict, init_body: bytes, out=None):
+    """Send initialize, then tools/list with its session ID, returning (init_result, tools_result) or None"""
+    out = out or sys.stdout
+    init_response = session.post(url, data=init_body, headers=headers, timeout=_TIMEOUT)
+    if init_response.status_code != 200:
+        print(f"   ❌ Initialize failed: {init_response.status_code}", file=out)
+        return None
+    
+    # Get session ID
+    session_id = init_response.headers.get('mcp-session-id')
+    if session_id:
+        headers = {**headers, "mcp-session-id": session_id}
+    
+    tools_response = session.post(url, data=_TOOLS_PAYLOAD_BYTES, headers=headers, timeout=_TIMEOUT)
+    if tools_response.status_code != 200:
+        print(f"   ❌ Tools request failed: {tools_response.status_code}", file=out)
+        return None
+    
+    return _parse_response(init_response), _parse_response(tools_response)
+
+
+def test_gateway_http(session=_SESSION, out=None):
     """Test gateway using simple HTTP requests"""
-    print("🌐 Testing Gateway URL with HTTP...")
+    out = out or sys.stdout
+    print("🌐 Testing Gateway URL with HTTP...", file=out)
     
     # Get gateway URL from environment or use default
     gateway_id = os.getenv("GATEWAY_ID", "your-gateway-id")
     region = os.getenv("AWS_REGION", "us-east-1")
     gateway_url = f"https://{gateway_id}.gateway.bedrock-agentcore.{region}.amazonaws.com/mcp"
     
-    print(f"   URL: {gateway_url}")
-    print(f"   Note: Testing without Cognito JWT authentication")
+    print(f"   URL: {gateway_url}", file=out)
+    print(f"   Note: Testing without Cognito JWT authentication", file=out)
     
     try:
-        # Create session
-        session = requests.Session()
-        
-        # Headers
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json, text/event-stream"
-        }
-        
-        session.headers.update(headers)
-        
         # Step 1: Initialize
-        print(f"\n📤 Step 1: Initialize")
-        initialize_payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "initialize",
-            "params": {
-                "protocolVersion": "2024-11-05",
-                "capabilities": {"tools": {}},
-                "clientInfo": {"name": "gateway-http-test", "version": "1.0.0"}
-            }
-        }
-        
-        init_response = session.post(gateway_url, json=initialize_payload, timeout=15)
+        # (headers are passed per call so nothing leaks into other tests on the shared session)
+        print(f"\n📤 Step 1: Initialize", file=out)
+        init_response = session.post(gateway_url, data=_GATEWAY_INIT_PAYLOAD_BYTES, headers=_BASE_HEADERS, timeout=_TIMEOUT)
         
-        print(f"📥 Initialize Response:")
-        print(f"   Status: {init_response.status_code}")
+        print(f"📥 Initialize Response:", file=out)
+        print(f"   Status: {init_response.status_code}", file=out)
         
         if init_response.status_code == 401:
-            print(f"   ❌ 401 Unauthorized - Cognito JWT required")
-            print(f"\n💡 The gateway requires Cognito authentication")
-            print(f"   To test with authentication:")
-            print(f"   1. Get Cognito client secret from AWS Console")
-            print(f"   2. Use AWS Cognito Identity Provider to get JWT")
-            print(f"   3. Add 'Authorization: Bearer <jwt>' header")
+            print(f"   ❌ 401 Unauthorized - Cognito JWT required", file=out)
+            print(f"\n💡 The gateway requires Cognito authentication", file=out)
+            print(f"   To test with authentication:", file=out)
+            print(f"   1. Get Cognito client secret from AWS Console", file=out)
+            print(f"   2. Use AWS Cognito Identity Provider to get JWT", file=out)
+            print(f"   3. Add 'Authorization: Bearer <jwt>' header", file=out)
             return False
         elif init_response.status_code == 403:
-            print(f"   ❌ 403 Forbidden - Authorization issue")
+            print(f"   ❌ 403 Forbidden - Authorization issue", file=out)
             return False
         elif init_response.status_code != 200:
-            print(f"   ❌ Unexpected status: {init_response.text[:200]}")
+            print(f"   ❌ Unexpected status: {init_response.text[:200]}", file=out)
             return False
         
         # Parse response
-        response_text = init_response.text
-        print(f"   Raw Response: {response_text[:200]}...")
+        print(f"   Raw Response: {init_response.content[:200].decode('utf-8', errors='replace')}...", file=out)
+        print(f"   📦 Content-Encoding: {init_response.headers.get('Content-Encoding', 'identity')}", file=out)
         
         # Check for session ID
+        headers = _BASE_HEADERS
         session_id = init_response.headers.get('mcp-session-id')
         if session_id:
-            print(f"   🆔 Session ID: {session_id}")
-            session.headers.update({"mcp-session-id": session_id})
+            print(f"   🆔 Session ID: {session_id}", file=out)
+            headers = {**_BASE_HEADERS, "mcp-session-id": session_id}
         
-        # Parse initialize response
-        if response_text.startswith('event:'):
-            lines = response_text.split('\n')
-            data_lines = [line.replace('data: ', '') for line in lines if line.startswith('data: ')]
-            if data_lines:
-                init_result = json.loads(data_lines[0])
-        else:
-            init_result = init_response.json()
+        init_result = _parse_response(init_response)
         
-        server_info = init_result.get('result', {}).get('serverInfo', {})
-        print(f"   ✅ Server: {server_info.get('name', 'Unknown')} v{server_info.get('version', 'Unknown')}")
+        try:
+            server_info = init_result['result']['serverInfo']
+        except (KeyError, TypeError):
+            server_info = {}
+        print(f"   ✅ Server: {server_info.get('name', 'Unknown')} v{server_info.get('version', 'Unknown')}", file=out)
         
         # Step 2: Request tools
-        print(f"\n📤 Step 2: Tools List")
-        tools_payload = {
-            "jsonrpc": "2.0",
-            "id": 2,
-            "method": "tools/list"
-        }
+        print(f"\n📤 Step 2: Tools List", file=out)
+        tools_response = session.post(gateway_url, data=_TOOLS_PAYLOAD_BYTES, headers=headers, timeout=_TIMEOUT)
         
-        tools_response = session.post(gateway_url, json=tools_payload, timeout=15)
-        
-        print(f"📥 Tools Response:")
-        print(f"   Status: {tools_response.status_code}")
+        print(f"📥 Tools Response:", file=out)
+        print(f"   Status: {tools_response.status_code}", file=out)
         
         if tools_response.status_code != 200:
-            print(f"   ❌ Tools request failed: {tools_response.text[:200]}")
+            print(f"   ❌ Tools request failed: {tools_response.text[:200]}", file=out)
             return False
         
-        # Parse tools response
-        tools_text = tools_response.text
-        
-        if tools_text.startswith('event:'):
-            lines = tools_text.split('\n')
-            data_lines = [line.replace('data: ', '') for line in lines if line.startswith('data: ')]
-            if data_lines:
-                tools_result = json.loads(data_lines[0])
-        else:
-            tools_result = tools_response.json()
+        tools_result = _parse_response(tools_response)
+        if 'error' in tools_result:
+            print(f"   ❌ Tools request failed: {tools_result['error']}", file=out)
+            return False
         
         # Get tools
-        tools = tools_result.get('result', {}).get('tools', [])
+        try:
+            tools = tools_result['result']['tools']
+        except (KeyError, TypeError):
+            tools = []
         
-        print(f"\n🔧 Tools Available Through Gateway:")
-        print(f"   Total: {len(tools)} tools")
+        print(f"\n🔧 Tools Available Through Gateway:", file=out)
+        print(f"   Total: {len(tools)} tools", file=out)
         
         if len(tools) == 0:
-            print(f"   ⚠️  No tools found")
-            print(f"   Full response: {json.dumps(tools_result, indent=2)[:500]}")
+            print(f"   ⚠️  No tools found", file=out)
+            print(f"   Full response: {json.dumps(tools_result, indent=2)[:500]}", file=out)
             return False
         
-        # Display tools
-        for i, tool in enumerate(tools[:10], 1):
-            name = tool.get('name', 'Unknown')
-            description = tool.get('description', 'No description')
-            print(f"   {i}. {name}")
-            print(f"      {description[:60]}...")
-        
-        if len(tools) > 10:
-            print(f"   ... and {len(tools) - 10} more tools")
-        
-        print(f"\n✅ Successfully accessed {len(tools)} tools through gateway!")
+        # Display the first 10 tools and count the rest in the same pass
+        displayed = 0
+        total = 0
+        for tool in tools:
+            total += 1
+            if displayed < 10:
+                displayed += 1
+                name = tool.get('name', 'Unknown')
+                description = tool.get('description', 'No description')
+                print(f"   {displayed}. {name}", file=out)
+                print(f"      {description[:60]}...", file=out)
+        
+        if total > 10:
+            print(f"   ... and {total - 10} more tools", file=out)
+        
+        print(f"\n✅ Successfully accessed {total} tools through gateway!", file=out)
         return True
         
+    except requests.exceptions.Timeout as e:
+        print(f"❌ HTTP request timed out (connect {_TIMEOUT[0]}s, read {_TIMEOUT[1]}s): {e}", file=out)
+        return False
     except requests.exceptions.RequestException as e:
-        print(f"❌ HTTP request failed: {e}")
+        print(f"❌ HTTP request failed: {e}", file=out)
         return False
     except Exception as e:
-        print(f"❌ Test failed: {e}")
+        print(f"❌ Test failed: {e}", file=out)
         import traceback
-        traceback.print_exc()
+        traceback.print_exc(file=out)
         return False
 
 
-def test_direct_mcp():
+def test_direct_mcp(token: str = None, session=_SESSION, out=None):
     """Test direct MCP connection for comparison"""
-    print("\n🔗 Testing Direct MCP Connection (for comparison)...")
-    
-    from oauth_manager import create_oauth_token_manager
+    out = out or sys.stdout
+    print("\n🔗 Testing Direct MCP Connection (for comparison)...", file=out)
     
     # Get MCP server URL from environment or use placeholder
     server_url = os.getenv("MCP_SERVER_URL", "https://your-mcp-server.example.com/mcp")
     
     try:
-        # Get OAuth token
-        token_manager = create_oauth_token_manager()
-        token = token_manager.get_token()
+        # Get OAuth token unless the caller already has one
+        if not token:
+            from oauth_manager import default_token_manager
+            token = default_token_manager().get_token()
         
-        session = requests.Session()
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "Accept": "application/json, text/event-stream"
-        }
-        session.headers.update(headers)
-        
-        # Initialize
-        initialize_payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "initialize",
-            "params": {
-                "protocolVersion": "2024-11-05",
-                "capabilities": {"tools": {}},
-                "clientInfo": {"name": "direct-test", "version": "1.0.0"}
-            }
-        }
+        headers = {**_BASE_HEADERS, "Authorization": f"Bearer {token}"}
         
-        init_response = session.post(server_url, json=initialize_payload, timeout=15)
-        
-        if init_response.status_code != 200:
-            print(f"   ❌ Initialize failed: {init_response.status_code}")
+        results = _initialize_then_list_tools(session, server_url, headers, _DIRECT_INIT_PAYLOAD_BYTES, out)
+        if not results:
             return False
+        _, tools_result = results
         
-        # Get session ID
-        session_id = init_response.headers.get('mcp-session-id')
-        if session_id:
-            session.headers.update({"mcp-session-id": session_id})
-        
-        # Request tools
-        tools_payload = {
-            "jsonrpc": "2.0",
-            "id": 2,
-            "method": "tools/list"
-        }
-        
-        tools_response = session.post(server_url, json=tools_payload, timeout=15)
-        
-        if tools_response.status_code != 200:
-            print(f"   ❌ Tools request failed: {tools_response.status_code}")
+        if 'error' in tools_result:
+            print(f"   ❌ Tools request failed: {tools_result['error']}", file=out)
             return False
         
-        # Parse response
-        tools_text = tools_response.text
-        if tools_text.startswith('event:'):
-            lines = tools_text.split('\n')
-            data_lines = [line.replace('data: ', '') for line in lines if line.startswith('data: ')]
-            if data_lines:
-                tools_result = json.loads(data_lines[0])
-        else:
-            tools_result = tools_response.json()
-        
-        tools = tools_result.get('result', {}).get('tools', [])
-        print(f"   ✅ Found {len(tools)} tools via direct connection")
+        try:
+            tools = tools_result['result']['tools']
+        except (KeyError, TypeError):
+            tools = []
+        print(f"   ✅ Found {len(tools)} tools via direct connection", file=out)
         
         return True
         
+    except requests.exceptions.Timeout as e:
+        print(f"   ❌ Direct connection timed out (connect {_TIMEOUT[0]}s, read {_TIMEOUT[1]}s): {e}", file=out)
+        return False
     except Exception as e:
-        print(f"   ❌ Direct connection failed: {e}")
+        print(f"   ❌ Direct connection failed: {e}", file=out)
         return False
 
 
 def main():
     """Main test function"""
+    # Flush the banner right away so there is feedback while the tests run
     print("🧪 Testing Gateway HTTP Access to Ansible MCP Tools\n")
-    print("="*70)
+    print("="*70, flush=True)
+    
+    from oauth_manager import default_token_manager
+    
+    # Get the OAuth token before starting the tests so its messages print in order
+    try:
+        token = default_token_manager().get_token()
+    except Exception as e:
+        print(f"❌ Failed to get OAuth token: {e}", flush=True)
+        token = None
     
-    # Test 1: Direct connection (baseline)
-    direct_ok = test_direct_mcp()
+    # Test 1: Direct connection (baseline) and Test 2: Gateway connection are
+    # independent, so run them concurrently and buffer each test's output
+    direct_out, gateway_out = io.StringIO(), io.StringIO()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        direct_future = executor.submit(test_direct_mcp, token, out=direct_out)
+        gateway_future = executor.submit(test_gateway_http, out=gateway_out)
+        direct_ok = direct_future.result()
+        gateway_ok = gateway_future.result()
     
-    # Test 2: Gateway connection
-    print("\n" + "="*70)
-    gateway_ok = test_gateway_http()
+    # Assemble the whole report and emit it with a single write
+    report = io.StringIO()
+    report.write(direct_out.getvalue())
+    print("\n" + "="*70, file=report)
+    report.write(gateway_out.getvalue())
     
     # Summary
-    print("\n" + "="*70)
-    print("📊 Test Results:")
-    print(f"   Direct MCP Connection: {'✅ SUCCESS' if direct_ok else '❌ FAILED'}")
-    print(f"   Gateway Connection: {'✅ SUCCESS' if gateway_ok else '❌ FAILED'}")
+    print("\n" + "="*70, file=report)
+    print("📊 Test Results:", file=report)
+    print(f"   Direct MCP Connection: {'✅ SUCCESS' if direct_ok else '❌ FAILED'}", file=report)
+    print(f"   Gateway Connection: {'✅ SUCCESS' if gateway_ok else '❌ FAILED'}", file=report)
     
-    print(f"\n💡 Conclusions:")
+    print(f"\n💡 Conclusions:", file=report)
     
     if gateway_ok:
-        print(f"   🎉 SUCCESS! Gateway provides access to Ansible MCP tools!")
-        print(f"   ✅ The gateway is working correctly")
-        print(f"   ✅ OAuth authentication (gateway → MCP) is working")
-        print(f"   ℹ️  Tools not showing in AWS Console UI is just a display bug")
-        print(f"\n🚀 You can now:")
-        print(f"   1. Use the gateway URL in your agents")
-        print(f"   2. Share the gateway with other teams")
-        print(f"   3. Centralize OAuth credential management")
-        return 0
+        print(f"   🎉 SUCCESS! Gateway provides access to Ansible MCP tools!", file=report)
+        print(f"   ✅ The gateway is working correctly", file=report)
+        print(f"   ✅ OAuth authentication (gateway → MCP) is working", file=report)
+        print(f"   ℹ️  Tools not showing in AWS Console UI is just a display bug", file=report)
+        print(f"\n🚀 You can now:", file=report)
+        print(f"   1. Use the gateway URL in your agents", file=report)
+        print(f"   2. Share the gateway with other teams", file=report)
+        print(f"   3. Centralize OAuth credential management", file=report)
+        exit_code = 0
     else:
-        print(f"   ⚠️  Gateway requires authentication or has issues")
-        print(f"   Continue using direct MCP connection for now")
-        return 1
+        print(f"   ⚠️  Gateway requires authentication or has issues", file=report)
+        print(f"   Continue using direct MCP connection for now", file=report)
+        exit_code = 1
+    
+    sys.stdout.write(report.getvalue())
+    return exit_code
 
 
 if __name__ == "__main__":